@@ -1,10 +1,16 @@
 import streamlit as st
 
 from components.config import AppConfig, InternalAppConfig
+from lib.fft import set_backend
+from lib.startup import start_warmup, report
 
 app_config = AppConfig.load()
 internal_app_config = InternalAppConfig.load()
 
+set_backend(internal_app_config.fft_backend, internal_app_config.fft_workers)
+if internal_app_config.do_warmup:
+    start_warmup(app_config.sampling_rate)
+
 st.set_page_config(
     page_title="yaepimet",
     page_icon="♫",
@@ -33,3 +39,6 @@ with placeholder.container():
     for j_p, p in enumerate(app_config.PARAMETERS):
         v_ = dict_[p.name]
         metric_columns[j_p].metric(p.display_name, v_)
+
+    with st.expander("Startup timing"):
+        st.text(report())
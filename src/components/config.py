@@ -14,11 +14,18 @@ batch_size_parameter = Parameter("batch_size", "Batch size of UDP packages (1 pa
                                  [20], 0, int)
 udp_port_parameter = Parameter("udp_port", "Port for UDP", [5005], 0, int)
 udp_ip_parameter = Parameter("udp_ip", "IP for UDP", ["0.0.0.0"], 0, str)
+stream_port_parameter = Parameter("stream_port", "Port for binary result stream (TCP)", [5006], 0, int)
+stream_ip_parameter = Parameter("stream_ip", "IP for binary result stream (TCP)", ["0.0.0.0"], 0, str)
+do_stream_parameter = Parameter("do_stream", "Publish results as binary stream", [True, False], 0, bool)
 
 lower_bound_frequency_cent_parameter = Parameter("lower_bound_frequency_cent",
                                                  "lower bound in cent for frequency domain plot", [-50, -25], 1, int)
 upper_bound_frequency_cent_parameter = Parameter("upper_bound_frequency_cent",
                                                  "upper bound in cent for frequency domain plot", [25, 50], 0, int)
+do_warmup_parameter = Parameter("do_warmup", "Warm up DSP functions at startup", [True, False], 0, bool)
+fft_backend_parameter = Parameter("fft_backend", "FFT backend", ["scipy", "numpy"], 0, str)
+fft_workers_parameter = Parameter("fft_workers", "Number of threads for FFT (-1: all cores)", [-1, 1, 2, 4, 8], 0, int)
+n_partials_parameter = Parameter("n_partials", "Number of partials to analyze", [2, 4, 8], 0, int)
 
 
 @dataclass
@@ -38,10 +45,18 @@ class AppConfig(ConfigHandler):
 class InternalAppConfig(ConfigHandler):
     PATH = "/app/internalappconfig.pkl"
     PARAMETERS = [batch_size_parameter, udp_ip_parameter, udp_port_parameter, lower_bound_frequency_cent_parameter,
-                  upper_bound_frequency_cent_parameter]
+                  upper_bound_frequency_cent_parameter, do_stream_parameter, stream_ip_parameter, stream_port_parameter,
+                  n_partials_parameter, do_warmup_parameter, fft_backend_parameter, fft_workers_parameter]
 
     batch_size: batch_size_parameter.dtype
     udp_ip: udp_ip_parameter.dtype
     udp_port: udp_port_parameter.dtype
     lower_bound_frequency_cent: lower_bound_frequency_cent_parameter.dtype
     upper_bound_frequency_cent: upper_bound_frequency_cent_parameter.dtype
+    do_stream: do_stream_parameter.dtype
+    stream_ip: stream_ip_parameter.dtype
+    stream_port: stream_port_parameter.dtype
+    n_partials: n_partials_parameter.dtype
+    do_warmup: do_warmup_parameter.dtype
+    fft_backend: fft_backend_parameter.dtype
+    fft_workers: fft_workers_parameter.dtype
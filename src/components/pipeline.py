@@ -0,0 +1,71 @@
+import asyncio
+import socket
+import time
+from typing import Callable, Union
+
+from components.config import AppConfig, InternalAppConfig
+from components.update import initial_buffers, update_from_data
+
+
+def open_socket(udp_ip: str, udp_port: int) -> socket.socket:
+    """UDP socket receiving the RTP audio stream."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((udp_ip, udp_port))
+    return sock
+
+
+async def produce(sock: socket.socket, queue: asyncio.Queue, on_package: Union[Callable, None] = None):
+    """
+    Receives UDP packages and puts them into queue. Note that recvfrom blocks the event loop, i.e. consume only runs
+    in between packages while the socket buffers incoming packages. If the socket has a timeout, a timeout just
+    yields to the event loop. on_package(data) is called for each package.
+    """
+    while True:
+        try:
+            try:
+                data, addr = sock.recvfrom(65507)
+            except socket.timeout:
+                _ = await asyncio.sleep(0.001)
+                continue
+            if on_package is not None:
+                on_package(data)
+            _ = await queue.put(data)
+            _ = await asyncio.sleep(0.001)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("Producer Exception", e)
+
+
+async def consume(queue: asyncio.Queue, app_config: AppConfig, internal_app_config: InternalAppConfig,
+                  on_update: Callable, on_error: Union[Callable, None] = None):
+    """
+    Processes batches of internal_app_config.batch_size packages via update_from_data. After each batch
+    on_update(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state,
+    processing_time) is called, exceptions are printed and passed to on_error.
+    """
+    buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state = initial_buffers()
+
+    while True:
+        try:
+            all_data = []
+            for _ in range(internal_app_config.batch_size):
+                item = await queue.get()
+                all_data += [item]
+                queue.task_done()
+
+            t_process = time.perf_counter()
+            buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state = \
+                update_from_data(all_data, buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records,
+                                 buffer_fft_result, state, app_config, internal_app_config)
+
+            on_update(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state,
+                      time.perf_counter() - t_process)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("Consumer Exception", e)
+            if on_error is not None:
+                on_error(e)
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import os
+import resource
+import time
+from collections import deque
+from typing import List, Union
+
+import numpy
+import pandas
+
+from components.config import AppConfig, InternalAppConfig
+from components.pipeline import open_socket, produce, consume
+from lib.fft import set_backend
+from lib.rtp import SequenceTracker, StreamConfig, RTPSender, start_senders, add_stream_arguments, \
+    stream_configs_from_arguments
+from lib.startup import warmup
+
+
+def rss_mb() -> float:
+    """Returns the current resident set size in MB (falls back to the peak value if /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def run_soak(configs: List[StreamConfig], app_config: AppConfig, internal_app_config: InternalAppConfig,
+             duration: float, target_ip: str = "127.0.0.1", report_interval: float = 10.,
+             ramp_interval: Union[float, None] = None, max_streams: Union[int, None] = None,
+             csv_path: Union[str, None] = None, seed: Union[int, None] = None) -> pandas.DataFrame:
+    """
+    Streams the given configs via RTP to target_ip/udp_port and runs the produce/consume coroutines of pages/Main
+    (without rendering) on a socket bound to udp_ip/udp_port for duration seconds. Every report_interval seconds a
+    row of statistics is printed (and written to csv_path if given):
+    - latency: time from arrival of the first package of a batch until update_from_data returned.
+    - realtime_factor: processing time of a batch divided by the audio duration it contains, > 1 means the pipeline
+      falls behind (which also shows up as a growing queue).
+    - processing_fft_*/processing_yin_*: processing time of batches which computed FFT/IF resp. only yin. FFT/IF is
+      only computed again after the note changed, i.e. use configs with note_duration to measure it repeatedly.
+    - lost_network: packages sent but never received (not counting injected loss), e.g. since the socket buffer
+      overflows while update_from_data blocks the event loop.
+    - rss_mb: memory usage of the process.
+    If ramp_interval is given, every ramp_interval seconds another stream (copy of the last config) is added
+    until max_streams is reached.
+    If do_warmup is set in internal_app_config, the DSP functions are warmed up before streaming starts.
+    """
+    set_backend(internal_app_config.fft_backend, internal_app_config.fft_workers)
+    if internal_app_config.do_warmup:
+        warmup(app_config.sampling_rate)
+
+    return asyncio.run(_soak(configs, app_config, internal_app_config, duration, target_ip, report_interval,
+                             ramp_interval, max_streams, csv_path, seed))
+
+
+async def _soak(configs: List[StreamConfig], app_config: AppConfig, internal_app_config: InternalAppConfig,
+                duration: float, target_ip: str, report_interval: float, ramp_interval: Union[float, None],
+                max_streams: Union[int, None], csv_path: Union[str, None],
+                seed: Union[int, None]) -> pandas.DataFrame:
+    sock = open_socket(internal_app_config.udp_ip, internal_app_config.udp_port)
+    # Only such that produce notices the end of the soak test if no packages arrive.
+    sock.settimeout(.5)
+
+    queue = asyncio.Queue()
+    tracker = SequenceTracker()
+    arrivals = deque()
+    latencies, processing_times, audio_durations = [], [], []
+    processing_times_fft, processing_times_yin = [], []
+    counts = {"batches": 0, "errors": 0, "fft_computations": 0}
+
+    def on_package(data: bytes):
+        arrivals.append(time.perf_counter())
+        tracker.update(data)
+
+    def on_update(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state,
+                  processing_time):
+        t_arrival = arrivals[0]
+        for _ in range(internal_app_config.batch_size):
+            arrivals.popleft()
+        counts["batches"] += 1
+        if state.just_computed_fft():
+            counts["fft_computations"] += 1
+            processing_times_fft.append(processing_time)
+        else:
+            processing_times_yin.append(processing_time)
+        latencies.append(time.perf_counter() - t_arrival)
+        processing_times.append(processing_time)
+        audio_durations.append(internal_app_config.batch_size * configs[0].samples_per_package /
+                               app_config.sampling_rate)
+
+    def on_error(e: Exception):
+        for _ in range(min(internal_app_config.batch_size, len(arrivals))):
+            arrivals.popleft()
+        counts["errors"] += 1
+
+    producer = asyncio.create_task(produce(sock, queue, on_package))
+    consumer = asyncio.create_task(consume(queue, app_config, internal_app_config, on_update, on_error))
+    senders: List[RTPSender] = start_senders(target_ip, internal_app_config.udp_port, configs, seed=seed)
+
+    rows = []
+    rss_start = rss_mb()
+    t_start = time.perf_counter()
+    t_report = t_start
+    t_ramp = t_start
+
+    try:
+        while True:
+            _ = await asyncio.sleep(.1)
+            now = time.perf_counter()
+
+            if ramp_interval is not None and now - t_ramp > ramp_interval and len(senders) < (max_streams or 0):
+                senders += start_senders(target_ip, internal_app_config.udp_port, [configs[-1]],
+                                         seed=None if seed is None else seed + len(senders))
+                t_ramp = now
+
+            if now - t_report > report_interval or now - t_start >= duration:
+                sent = sum(s.stats.sent for s in senders)
+                received = tracker.received()
+                row = {"elapsed": now - t_start,
+                       "streams": len(senders),
+                       **counts,
+                       "sent": sent,
+                       "received": received,
+                       "lost_injected": sum(s.stats.lost for s in senders),
+                       "lost_network": max(sent - received, 0),
+                       "lost_sequence": tracker.lost(),
+                       "out_of_order": tracker.out_of_order(),
+                       "queue_size": queue.qsize(),
+                       "latency_mean": numpy.mean(latencies) if latencies else numpy.nan,
+                       "latency_p95": numpy.percentile(latencies, 95) if latencies else numpy.nan,
+                       "latency_max": numpy.max(latencies) if latencies else numpy.nan,
+                       "realtime_factor": sum(processing_times) / sum(audio_durations) if audio_durations else
+                       numpy.nan,
+                       "processing_fft_mean": numpy.mean(processing_times_fft) if processing_times_fft else numpy.nan,
+                       "processing_fft_max": numpy.max(processing_times_fft) if processing_times_fft else numpy.nan,
+                       "processing_yin_mean": numpy.mean(processing_times_yin) if processing_times_yin else numpy.nan,
+                       "processing_yin_max": numpy.max(processing_times_yin) if processing_times_yin else numpy.nan,
+                       "rss_mb": rss_mb(),
+                       "rss_growth_mb": rss_mb() - rss_start}
+                rows += [row]
+                print(", ".join(f"{k}={numpy.round(v, 3)}" for k, v in row.items()), flush=True)
+                if csv_path is not None:
+                    pandas.DataFrame(rows).to_csv(csv_path, index=False)
+
+                latencies.clear()
+                processing_times.clear()
+                processing_times_fft.clear()
+                processing_times_yin.clear()
+                audio_durations.clear()
+                t_report = now
+
+                if now - t_start >= duration:
+                    break
+    finally:
+        for sender in senders:
+            sender.stop()
+        producer.cancel()
+        consumer.cancel()
+        _ = await asyncio.gather(producer, consumer, return_exceptions=True)
+        sock.close()
+
+    return pandas.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test of the receive/update pipeline using the RTP load "
+                                                 "generator (sends to --ip/--port, receives on the configured udp_ip).")
+    add_stream_arguments(parser)
+    parser.add_argument("--report-interval", type=float, default=10.)
+    parser.add_argument("--ramp-interval", type=float, default=None,
+                        help="Seconds after which another stream is added (capacity search).")
+    parser.add_argument("--max-streams", type=int, default=None)
+    parser.add_argument("--csv", default=None, help="Path to write the report to.")
+    parser.add_argument("--default-config", action="store_true",
+                        help="Use default configs instead of loading them from /app.")
+    args = parser.parse_args()
+
+    if args.default_config:
+        app_config = AppConfig.default()
+        internal_app_config = InternalAppConfig.default()
+    else:
+        app_config = AppConfig.load()
+        internal_app_config = InternalAppConfig.load()
+    internal_app_config.udp_port = args.port
+
+    run_soak(stream_configs_from_arguments(args), app_config, internal_app_config,
+             duration=args.duration if args.duration is not None else float("inf"), target_ip=args.ip,
+             report_interval=args.report_interval, ramp_interval=args.ramp_interval, max_streams=args.max_streams,
+             csv_path=args.csv, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
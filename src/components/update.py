@@ -1,14 +1,17 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
 
-import librosa
 import numpy
 import pandas
 
 from components.config import AppConfig, InternalAppConfig
-from lib.audio import audio_from_udp, compute_yin, res_cent_to_dt, compute_fft, compute_if
+from lib.audio import audio_from_udp, compute_yin, res_cent_to_dt, compute_fft, compute_if, analyze_partials, \
+    frequency_to_cents
+from lib.startup import LazyModule
 from lib.utils import DataBuffer
 
+librosa = LazyModule("librosa")
+
 
 @dataclass
 class ComputationState:
@@ -23,6 +26,38 @@ class ComputationState:
         return (not val_1) and val_2
 
 
+def initial_buffers() -> Tuple[DataBuffer, DataBuffer, DataBuffer, DataBuffer, DataBuffer, ComputationState]:
+    """Returns empty buffers and computation state as expected by update_from_data."""
+    buffer_yin = DataBuffer(columns=["t", "note0", "f0", "pitch0", "dt"],
+                            cache_size=10000,
+                            time_col="t",
+                            time_range=15 * 60,
+                            groupby_cols=["note0"],
+                            group_size=500)
+
+    buffer_audio = DataBuffer(columns=["val"], cache_size=1200000)  # 1300000 corresponds to 1 cent resolution for C2
+
+    buffer_rolling_yin = DataBuffer(columns=["note0", "f0", "pitch0"], cache_size=100)
+    buffer_rolling_yin.ingest(pandas.DataFrame([{"note0": "UNK", "f0": 0, "pitch0": -100}]))
+
+    buffer_records = DataBuffer(
+        columns=["note0", "f0", "pitch0", "fft pitch 0", "fft pitch 1", "if pitch 0", "if pitch 1", "fft beat 0",
+                 "fft beat 1"],
+        cache_size=1000)
+
+    buffer_fft_result = DataBuffer(columns=["x", "y", "type"], cache_size=300000)
+
+    buffer_fft_computation = DataBuffer(columns=["val"], cache_size=5)
+    buffer_fft_computation.ingest(pandas.DataFrame([{"val": False}]))
+
+    state = ComputationState(buffer_fft_computation=buffer_fft_computation,
+                             current_filling_buffer_audio=-1,
+                             target_buffer_size_if=-1,
+                             target_buffer_size_fft=-1)
+
+    return buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state
+
+
 def update_from_data(all_data: List[bytes], buffer_yin: DataBuffer, buffer_rolling_yin: DataBuffer,
                      buffer_audio: DataBuffer, buffer_records: DataBuffer,
                      buffer_fft_result: DataBuffer, state: ComputationState, app_config: AppConfig,
@@ -78,9 +113,6 @@ def update_from_data(all_data: List[bytes], buffer_yin: DataBuffer, buffer_rolli
 
     if compute_now:
 
-        fl = 2 ** (internal_app_config.lower_bound_frequency_cent / 1200) * f0
-        fu = 2 ** (internal_app_config.upper_bound_frequency_cent / 1200) * f0
-
         if do_fft:
             magnitudes_fft, frequencies_fft = compute_fft(
                 buffer_audio.df["val"].values[-int(.9 * target_buffer_size_fft):],
@@ -92,49 +124,40 @@ def update_from_data(all_data: List[bytes], buffer_yin: DataBuffer, buffer_rolli
         magnitudes_if, frequencies_if = compute_if(buffer_audio.df["val"].values[-int(.9 * target_buffer_size_if):],
                                                    sampling_rate)
 
-        def eval_chart(frequencies, vals, fu, fl):
-            m = (frequencies < fu) & (frequencies > fl)
-            cents = numpy.log2(frequencies[m] / pitch_tuning + 1e-10) * 1200
-            cents = cents - numpy.round(cents / 100) * 100
-
-            if m.sum() == 0:
-                return numpy.array([]), numpy.array([]), numpy.nan
-            else:
-                argmax_cents = cents[vals[m] == vals[m].max()]
-                if len(argmax_cents) == 0:
-                    argmax_cents = numpy.nan
-                else:
-                    argmax_cents = argmax_cents[0]
-                x = cents
-                y = vals[m]
-                m_ = (cents >= internal_app_config.lower_bound_frequency_cent) & (
-                        cents <= internal_app_config.upper_bound_frequency_cent)
-
-                x_ = x[m_]
-                y_ = y[m_]
-                return x_, y_, argmax_cents
-
-        x0, y0, argmax0_cents = eval_chart(frequencies_fft, magnitudes_fft, fu, fl)
-        x1, y1, argmax1_cents = eval_chart(frequencies_fft, magnitudes_fft, 2 * fu, 2 * fl)
-
-        x0_if, y0_if, argmax0_cents_if = eval_chart(frequencies_if, magnitudes_if, fu, fl)
-        x1_if, y1_if, argmax1_cents_if = eval_chart(frequencies_if, magnitudes_if, 2 * fu, 2 * fl)
-
-        df0 = pandas.DataFrame({"type": "f0", "x": x0, "y": y0 / (numpy.sqrt(sum(y0 ** 2)))})
-        df1 = pandas.DataFrame({"type": "f1", "x": x1, "y": y1 / (numpy.sqrt(sum(y1 ** 2)))})
-        df0_if = pandas.DataFrame({"type": "f0_if", "x": x0_if, "y": y0_if / (numpy.sqrt(sum(y0_if ** 2)))})
-        df1_if = pandas.DataFrame({"type": "f1_if", "x": x1_if, "y": y1_if / (numpy.sqrt(sum(y1_if ** 2)))})
-
-        df_fft = pandas.concat([df0, df1, df0_if, df1_if], ignore_index=True)
+        lower_bound_cent = internal_app_config.lower_bound_frequency_cent
+        upper_bound_cent = internal_app_config.upper_bound_frequency_cent
+        n_partials = internal_app_config.n_partials
+
+        partials_fft, frequencies_fft, magnitudes_fft = analyze_partials(
+            frequencies_fft, magnitudes_fft, f0, n_partials, lower_bound_cent, upper_bound_cent, pitch_tuning,
+            is_sorted=True)
+        partials_if, frequencies_if, magnitudes_if = analyze_partials(
+            frequencies_if, magnitudes_if, f0, n_partials, lower_bound_cent, upper_bound_cent, pitch_tuning)
+
+        def eval_chart(partials, frequencies, vals, suffix):
+            list_df = []
+            for row in partials:
+                x = frequency_to_cents(frequencies[row["start"]:row["stop"]] / row["partial"], pitch_tuning)
+                y = vals[row["start"]:row["stop"]]
+                m = (x >= lower_bound_cent) & (x <= upper_bound_cent)
+                x, y = x[m], y[m]
+                list_df += [pandas.DataFrame({"type": f"f{row['partial'] - 1}{suffix}", "x": x,
+                                              "y": y / numpy.sqrt(numpy.sum(y ** 2))})]
+            return list_df
+
+        df_fft = pandas.concat(eval_chart(partials_fft, frequencies_fft, magnitudes_fft, "") +
+                               eval_chart(partials_if, frequencies_if, magnitudes_if, "_if"), ignore_index=True)
         buffer_fft_result.reset()
         buffer_fft_result.ingest(df_fft)
 
         this_record = pandas.DataFrame([{"note0": note0, "f0": numpy.round(f0, 2),
                                          "pitch0": numpy.round(pitch0 * 100, 2),
-                                         "fft pitch 0": numpy.round(argmax0_cents, 2),
-                                         "fft pitch 1": numpy.round(argmax1_cents, 2),
-                                         "if pitch 0": numpy.round(argmax0_cents_if, 2),
-                                         "if pitch 1": numpy.round(argmax1_cents_if, 2),
+                                         "fft pitch 0": numpy.round(partials_fft["cents"][0], 2),
+                                         "fft pitch 1": numpy.round(partials_fft["cents"][1], 2),
+                                         "if pitch 0": numpy.round(partials_if["cents"][0], 2),
+                                         "if pitch 1": numpy.round(partials_if["cents"][1], 2),
+                                         "fft beat 0": numpy.round(partials_fft["beat_hz"][0], 2),
+                                         "fft beat 1": numpy.round(partials_fft["beat_hz"][1], 2),
                                          }])
 
         buffer_records.ingest(this_record)
@@ -1,9 +1,14 @@
 from typing import Tuple, List
 
-import librosa
 import numpy
 import pandas
-from scapy.all import RTP
+
+from lib.fft import get_backend, register_fftlib, hann_half_window, fft_frequencies
+from lib.startup import LazyModule
+
+# Heavy imports are deferred until first usage, see lib/startup.py for warming them up in the background.
+librosa = LazyModule("librosa")
+scapy_all = LazyModule("scapy.all")
 
 
 def res_cent_to_dt(res_cent: float, f: float) -> float:
@@ -36,7 +41,7 @@ def read_udp_package(data: bytes) -> Tuple[numpy.array, int]:
     Assumes payload type to be sl16 currently.
     """
 
-    rtp = RTP(data)
+    rtp = scapy_all.RTP(data)
 
     #assert rtp.payload_type == 11
     # According to https://en.wikipedia.org/wiki/RTP_payload_formats this refers to 44.1kHu, single channel, 16 bit audio.
@@ -64,6 +69,7 @@ def compute_yin(audio: numpy.array, t0: int, sr: int = 44100, base_frequency: in
                 frame_length=2 * 2048):
     """Uses librosa.yin to compute sequence of pitches and puts result into dataframe."""
 
+    register_fftlib()
     f0s = librosa.yin(audio[:], frame_length=frame_length, hop_length=hop_length,
                       sr=sr, fmin=librosa.note_to_hz('C2'),
                       fmax=librosa.note_to_hz('C7'))
@@ -80,19 +86,22 @@ def compute_yin(audio: numpy.array, t0: int, sr: int = 44100, base_frequency: in
 
 
 def compute_fft(audio: numpy.array, sampling_rate: int):
-    """Convience wrapper for librosa.stft with suitable parameters. Returns magnitudes and frequencies."""
+    """
+    Amplitude spectrum of the audio zero padded to the power of two n_fft = 8 * 2**floor(log2(len(audio))), i.e. the
+    same frequency grid for all backends (only compute_if uses composite transform sizes). Equivalent to a single frame
+    of librosa.stft (center=True, hann window with n_fft = win_length = hop_length), but computed directly by the
+    selected FFT backend (see lib/fft.py) with cached windows/frequencies. Returns magnitudes and frequencies.
+    """
 
     audio = audio[~numpy.isnan(audio)]
-    n_fft = 2 ** (int(numpy.log2(len(audio)))) * 2 ** 3
+    backend = get_backend()
+    n_fft = 2 ** int(numpy.log2(len(audio))) * 8
 
-    hop_length = n_fft
-    win_length = n_fft
-
-    stft_raw = librosa.stft(audio, hop_length=hop_length, n_fft=n_fft, win_length=win_length, center=True)
-    stft = numpy.abs(stft_raw)
-
-    frequencies = librosa.fft_frequencies(sr=sampling_rate, n_fft=n_fft)
-    magnitudes = numpy.mean(stft, axis=1)
+    # The first frame of librosa.stft(center=True) starts n_fft // 2 samples before the audio, i.e. only the second
+    # half of the window is relevant. The offset is a phase shift and does not change the magnitudes.
+    window = hann_half_window(n_fft)[:len(audio)]
+    magnitudes = numpy.abs(backend.rfft(audio * window, n=n_fft))
+    frequencies = fft_frequencies(n_fft, sampling_rate)
 
     return magnitudes, frequencies
 
@@ -102,7 +111,8 @@ def compute_if(audio: numpy.array, sampling_rate, n_steps=10, hop_length=2048 //
     Returns magnitudes and frequencies."""
 
     audio = audio[~numpy.isnan(audio)]
-    n_fft = len(audio) // 1 - n_steps * hop_length
+    register_fftlib()
+    n_fft = get_backend().prev_fast_len(len(audio) - n_steps * hop_length)
 
     frequencies, times, magnitudes = librosa.reassigned_spectrogram(audio, center=False, hop_length=hop_length,
                                                                     n_fft=n_fft, sr=sampling_rate)
@@ -113,3 +123,87 @@ def compute_if(audio: numpy.array, sampling_rate, n_steps=10, hop_length=2048 //
     frequencies = frequencies.flatten()
 
     return magnitudes, frequencies
+
+
+PARTIAL_DTYPE = numpy.dtype([("partial", numpy.int32), ("frequency", numpy.float64), ("cents", numpy.float64),
+                             ("magnitude", numpy.float64), ("width_cents", numpy.float64), ("beat_hz", numpy.float64),
+                             ("start", numpy.int64), ("stop", numpy.int64)])
+
+
+def frequency_to_cents(frequencies: numpy.array, base_frequency: float) -> numpy.array:
+    """Deviation in cent from the closest note of the equal temperament w.r.t. base_frequency (e.g. a=442Hz)."""
+    cents = numpy.log2(frequencies / base_frequency + 1e-10) * 1200
+    return cents - numpy.round(cents / 100) * 100
+
+
+def analyze_partials(frequencies: numpy.array, magnitudes: numpy.array, f0: float, n_partials: int = 2,
+                     lower_bound_cent: float = -25, upper_bound_cent: float = 25, base_frequency: float = 442,
+                     is_sorted: bool = False, beat_threshold: float = .25,
+                     min_beat_hz: float = .1) -> Tuple[numpy.array, numpy.array, numpy.array]:
+    """
+    Analyzes the windows [k * f0 * 2**(lower_bound_cent/1200), k * f0 * 2**(upper_bound_cent/1200)] for the partials
+    k=1, ..., n_partials at once. Unless is_sorted (e.g. FFT frequencies), all values inside of any window are selected
+    in a single pass and sorted by frequency, the windows are then given by slices found via searchsorted.
+    Returns structured array of dtype PARTIAL_DTYPE (one row per partial) as well as the sorted frequencies and
+    magnitudes the start/stop columns refer to. For each partial:
+    - frequency/cents/magnitude of the peak, nan if the window is empty. Cents are measured relative to k times the
+      reference of the closest note (i.e. frequency_to_cents of frequency / k), such that a harmonic partial of an in
+      tune note has 0 cent instead of the deviation of the equal temperament from just intervals.
+    - width_cents: full width at half maximum around the peak.
+    - beat_hz: distance to the highest other local maximum of at least beat_threshold times the peak magnitude
+      outside of the peak and at least min_beat_hz apart, e.g. the beating of paired reeds (tremolo). nan if there is
+      none. Width and beat are only meaningful for spectra on a grid (FFT), not for reassigned frequencies (IF).
+    """
+    lower = 2 ** (lower_bound_cent / 1200)
+    upper = 2 ** (upper_bound_cent / 1200)
+    # Window k has to stay within (k - .5, k + .5) * f0 such that the windows can be identified by rounding.
+    assert n_partials * (upper - 1) < .5 and n_partials * (1 - lower) < .5
+
+    if not is_sorted:
+        # Single pass over the full array (which is mostly nan for reassigned frequencies), the exact windows are then
+        # only evaluated for the remaining values.
+        index = numpy.flatnonzero((frequencies > f0 * lower) & (frequencies < n_partials * f0 * upper))
+        frequencies = frequencies[index]
+        k = numpy.rint(frequencies / f0)
+        m = (frequencies > k * f0 * lower) & (frequencies < k * f0 * upper)
+        frequencies = frequencies[m]
+        magnitudes = magnitudes[index[m]]
+        order = numpy.argsort(frequencies, kind="stable")
+        frequencies = frequencies[order]
+        magnitudes = magnitudes[order]
+
+    partials = numpy.arange(1, n_partials + 1)
+
+    result = numpy.zeros(n_partials, dtype=PARTIAL_DTYPE)
+    result["partial"] = partials
+    result["start"] = numpy.searchsorted(frequencies, partials * f0 * lower, side="right")
+    result["stop"] = numpy.searchsorted(frequencies, partials * f0 * upper, side="left")
+    for column in ["frequency", "cents", "magnitude", "width_cents", "beat_hz"]:
+        result[column] = numpy.nan
+
+    for row in result:
+        f = frequencies[row["start"]:row["stop"]]
+        y = magnitudes[row["start"]:row["stop"]]
+        if len(f) == 0:
+            continue
+
+        j = numpy.argmax(y)
+        row["frequency"] = f[j]
+        row["magnitude"] = y[j]
+
+        above = y >= y[j] / 2
+        left = j - numpy.argmin(above[j::-1]) + 1 if not above[:j + 1].all() else 0
+        right = j + numpy.argmin(above[j:]) - 1 if not above[j:].all() else len(y) - 1
+        row["width_cents"] = 1200 * numpy.log2(f[right] / f[left])
+
+        if len(y) > 2:
+            local_maxima = numpy.flatnonzero((y[1:-1] > y[:-2]) & (y[1:-1] >= y[2:])) + 1
+            local_maxima = local_maxima[((local_maxima < left) | (local_maxima > right)) &
+                                        (y[local_maxima] >= beat_threshold * y[j]) &
+                                        (numpy.abs(f[local_maxima] - f[j]) >= min_beat_hz)]
+            if len(local_maxima) > 0:
+                row["beat_hz"] = abs(f[local_maxima[numpy.argmax(y[local_maxima])]] - f[j])
+
+    result["cents"] = frequency_to_cents(result["frequency"] / result["partial"], base_frequency)
+
+    return result, frequencies, magnitudes
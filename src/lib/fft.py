@@ -0,0 +1,137 @@
+import warnings
+from functools import lru_cache
+
+import numpy
+
+from lib.startup import LazyModule
+
+librosa = LazyModule("librosa")
+scipy_fft = LazyModule("scipy.fft")
+
+BACKENDS = ["scipy", "numpy"]
+
+
+class FFTBackend:
+    """
+    Subset of the numpy.fft interface as expected by librosa.set_fftlib, i.e. librosa.stft and friends use the backend
+    as well. Base class uses numpy.fft (single threaded) and keeps the transform sizes used before backends existed,
+    i.e. prev_fast_len does not change the size.
+    """
+    name = "numpy"
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+
+    def fft(self, a, n=None, axis=-1, norm=None):
+        return numpy.fft.fft(a, n=n, axis=axis, norm=norm)
+
+    def ifft(self, a, n=None, axis=-1, norm=None):
+        return numpy.fft.ifft(a, n=n, axis=axis, norm=norm)
+
+    def rfft(self, a, n=None, axis=-1, norm=None):
+        return numpy.fft.rfft(a, n=n, axis=axis, norm=norm)
+
+    def irfft(self, a, n=None, axis=-1, norm=None):
+        return numpy.fft.irfft(a, n=n, axis=axis, norm=norm)
+
+    def next_fast_len(self, n: int) -> int:
+        """Smallest fast transform size >= n."""
+        return _fast_len(n, (2,), upper=True)
+
+    def prev_fast_len(self, n: int) -> int:
+        """Largest fast transform size <= n."""
+        return n
+
+
+class ScipyFFTBackend(FFTBackend):
+    """scipy.fft with workers threads (-1: all cores), fast for lengths with prime factors up to 11."""
+    name = "scipy"
+    primes = (2, 3, 5, 7, 11)
+
+    def next_fast_len(self, n: int) -> int:
+        return _fast_len(n, self.primes, upper=True)
+
+    def prev_fast_len(self, n: int) -> int:
+        return _fast_len(n, self.primes, upper=False)
+
+    def fft(self, a, n=None, axis=-1, norm=None):
+        return scipy_fft.fft(a, n=n, axis=axis, norm=norm, workers=self.workers)
+
+    def ifft(self, a, n=None, axis=-1, norm=None):
+        return scipy_fft.ifft(a, n=n, axis=axis, norm=norm, workers=self.workers)
+
+    def rfft(self, a, n=None, axis=-1, norm=None):
+        return scipy_fft.rfft(a, n=n, axis=axis, norm=norm, workers=self.workers)
+
+    def irfft(self, a, n=None, axis=-1, norm=None):
+        return scipy_fft.irfft(a, n=n, axis=axis, norm=norm, workers=self.workers)
+
+
+@lru_cache(maxsize=256)
+def _fast_len(n: int, primes: tuple, upper: bool) -> int:
+    """Smallest (upper) or largest (not upper) number >= n resp. <= n whose prime factors are all in primes."""
+    assert n >= 1
+    candidates = [1]
+    for p in primes:
+        candidates = [c * p ** j for c in candidates for j in range(int(numpy.log(2 * n) / numpy.log(p)) + 2)
+                      if c * p ** j < 2 * n]
+    candidates = numpy.array(candidates)
+    if upper:
+        return int(candidates[candidates >= n].min())
+    return int(candidates[candidates <= n].max())
+
+
+_backend = FFTBackend()
+_registered_backend = None
+
+
+def get_backend() -> FFTBackend:
+    return _backend
+
+
+def set_backend(name: str = "scipy", workers: int = -1) -> FFTBackend:
+    """
+    Selects the FFT backend used by lib.audio (and librosa, see register_fftlib). workers=-1 uses all cores (scipy
+    only).
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Expected backend {name} to be one of {BACKENDS}.")
+
+    _backend = ScipyFFTBackend(workers) if name == "scipy" else FFTBackend(1)
+    return _backend
+
+
+def register_fftlib():
+    """
+    Registers the selected backend with librosa if not done yet. Called by lib.audio before using librosa rather than
+    by set_backend, such that selecting a backend at startup does not import librosa.
+    """
+    global _registered_backend
+    if _registered_backend is _backend:
+        return
+
+    with warnings.catch_warnings():
+        # Deprecated in librosa>=0.11 in favour of scipy.fft backends, but the way to go for the pinned version.
+        warnings.simplefilter("ignore")
+        librosa.set_fftlib(_backend)
+    _registered_backend = _backend
+
+
+@lru_cache(maxsize=4)
+def hann_half_window(n_fft: int) -> numpy.array:
+    """
+    Second half (samples n_fft // 2, ..., n_fft - 1) of the periodic Hann window of size n_fft (as used by
+    librosa.stft). Cached per n_fft only, callers slice it to the length of the audio.
+    """
+    window = 0.5 - 0.5 * numpy.cos(2 * numpy.pi * numpy.arange(n_fft // 2, n_fft) / n_fft)
+    window.setflags(write=False)
+    return window
+
+
+@lru_cache(maxsize=4)
+def fft_frequencies(n_fft: int, sampling_rate: int) -> numpy.array:
+    """Same as librosa.fft_frequencies, cached since frequency grids of the large transforms are expensive."""
+    frequencies = numpy.fft.rfftfreq(n=n_fft, d=1. / sampling_rate)
+    frequencies.setflags(write=False)
+    return frequencies
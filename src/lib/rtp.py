@@ -0,0 +1,318 @@
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple, Union
+
+import numpy
+
+RTP_HEADER = struct.Struct("!BBHII")
+RTP_VERSION = 2
+# Dynamic payload type as used by ffmpeg for pcm_s16le, see README.
+PAYLOAD_TYPE_S16LE = 97
+# 730 samples corresponds to 1460 bytes of payload, i.e. the package size ffmpeg produces.
+SAMPLES_PER_PACKAGE = 730
+
+
+def build_rtp_package(payload: bytes, sequence: int, timestamp: int, ssrc: int,
+                      payload_type: int = PAYLOAD_TYPE_S16LE, marker: bool = False) -> bytes:
+    """Returns RTP package (fixed 12 byte header without csrc list) with the given payload."""
+    first_byte = RTP_VERSION << 6
+    second_byte = (int(marker) << 7) | (payload_type & 0x7f)
+    header = RTP_HEADER.pack(first_byte, second_byte, sequence & 0xffff, timestamp & 0xffffffff, ssrc & 0xffffffff)
+    return header + payload
+
+
+def parse_rtp_header(data: bytes) -> Tuple[int, int, int]:
+    """Returns sequence number, timestamp and ssrc of a RTP package without parsing the payload."""
+    _, _, sequence, timestamp, ssrc = RTP_HEADER.unpack_from(data)
+    return sequence, timestamp, ssrc
+
+
+def synthetic_audio(frequency: float, duration: float, sampling_rate: int = 44100, amplitude: float = .3,
+                    partials: Union[List[float], None] = None) -> numpy.array:
+    """
+    Returns a sine of the given frequency (optionally with additional partials given as relative amplitudes of
+    the multiples 2*f, 3*f, ...) as float signal in [-1, 1].
+    """
+    t = numpy.arange(int(duration * sampling_rate)) / sampling_rate
+    audio = numpy.sin(2 * numpy.pi * frequency * t)
+    for j, a in enumerate(partials or []):
+        audio += a * numpy.sin(2 * numpy.pi * (j + 2) * frequency * t)
+    audio = amplitude * audio / numpy.max(numpy.abs(audio))
+    return audio
+
+
+def load_pcm(path: str, sampling_rate: int = 44100) -> numpy.array:
+    """
+    Loads recorded audio as float signal in [-1, 1]. Files ending with .raw/.pcm are interpreted as PCM S16LE
+    (single channel), everything else is read via librosa and resampled to sampling_rate.
+    """
+    if path.endswith(".raw") or path.endswith(".pcm"):
+        return numpy.fromfile(path, dtype="<i2").astype(numpy.float64) / 2 ** 15
+
+    import librosa
+    audio, _ = librosa.load(path, sr=sampling_rate, mono=True)
+    return audio
+
+
+def audio_to_pcm(audio: numpy.array) -> bytes:
+    """Converts float signal in [-1, 1] to PCM S16LE."""
+    return (numpy.clip(audio, -1, 1) * (2 ** 15 - 1)).astype("<i2").tobytes()
+
+
+def packetize(audio: numpy.array, samples_per_package: int = SAMPLES_PER_PACKAGE) -> List[bytes]:
+    """Splits audio into PCM S16LE payloads of samples_per_package samples each. A trailing remainder is dropped."""
+    pcm = audio_to_pcm(audio)
+    size = 2 * samples_per_package
+    return [pcm[i:i + size] for i in range(0, len(pcm) - size + 1, size)]
+
+
+def note_schedule(frequencies: List[float], note_duration: float, sampling_rate: int = 44100) -> numpy.array:
+    """
+    Synthetic signal playing each of the frequencies for note_duration seconds. Since the app only computes FFT/IF
+    again after the note changed, consecutive frequencies should belong to different notes and note_duration should
+    exceed the time needed to fill the FFT/IF buffer (at least 3 seconds, see components/update.py).
+    """
+    return numpy.concatenate([synthetic_audio(f, note_duration, sampling_rate) for f in frequencies])
+
+
+@dataclass
+class StreamConfig:
+    """
+    Defines a single RTP stream of the load generator. If audio is None a synthetic signal with the given frequency
+    is used, or, if note_duration is given, the notes are cycled every note_duration seconds (see note_schedule).
+    package_rate is given in packages per second, None means real time w.r.t. sampling_rate.
+    loss/reorder/burst_probability are per package probabilities, a burst sends burst_size packages back to back.
+    """
+    frequency: float = 442.
+    notes: Union[List[float], None] = None
+    note_duration: Union[float, None] = None
+    sampling_rate: int = 44100
+    samples_per_package: int = SAMPLES_PER_PACKAGE
+    package_rate: Union[float, None] = None
+    loss: float = 0.
+    reorder: float = 0.
+    burst_probability: float = 0.
+    burst_size: int = 1
+    ssrc: Union[int, None] = None
+    audio: Union[numpy.array, None] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        assert self.samples_per_package > 0
+        assert 0 <= self.loss < 1
+        assert 0 <= self.reorder < 1
+        assert 0 <= self.burst_probability < 1
+        assert self.burst_size >= 1
+        assert self.note_duration is None or (self.note_duration > 0 and len(self.notes or []) >= 2)
+
+    def effective_package_rate(self) -> float:
+        if self.package_rate is None:
+            return self.sampling_rate / self.samples_per_package
+        return self.package_rate
+
+
+@dataclass
+class SenderStats:
+    """Counters of a RTPSender. sent does not include packages dropped on purpose (lost)."""
+    sent: int = 0
+    lost: int = 0
+    reordered: int = 0
+    bursts: int = 0
+    late: int = 0
+
+
+class RTPSender(threading.Thread):
+    """
+    Streams PCM S16LE via RTP to (ip, port) according to a StreamConfig until stop() is called or duration (seconds)
+    has passed. The audio is repeated cyclically. Sequence numbers and timestamps are increased for dropped packages
+    as well, such that a receiver can detect the injected loss.
+    """
+
+    def __init__(self, ip: str, port: int, config: StreamConfig, duration: Union[float, None] = None,
+                 seed: Union[int, None] = None):
+        super().__init__(daemon=True)
+        self.address = (ip, port)
+        self.config = config
+        self.duration = duration
+        self.stats = SenderStats()
+
+        self._random = random.Random(seed)
+        self._stop_event = threading.Event()
+
+        self.ssrc = config.ssrc if config.ssrc is not None else self._random.getrandbits(32)
+        if config.audio is not None:
+            audio = config.audio
+        elif config.note_duration is not None:
+            audio = note_schedule(config.notes, config.note_duration, config.sampling_rate)
+        else:
+            audio = synthetic_audio(config.frequency, 1., config.sampling_rate)
+        self.payloads = packetize(audio, config.samples_per_package)
+        if len(self.payloads) == 0:
+            raise ValueError(f"Expected at least {config.samples_per_package} samples of audio.")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def packages(self):
+        """Generates the (unimpaired) RTP packages of the stream."""
+        sequence = self._random.getrandbits(16)
+        timestamp = self._random.getrandbits(32)
+        j = 0
+        while True:
+            payload = self.payloads[j % len(self.payloads)]
+            yield build_rtp_package(payload, sequence, timestamp, self.ssrc, marker=(j == 0))
+            sequence += 1
+            timestamp += self.config.samples_per_package
+            j += 1
+
+    def run(self):
+        config = self.config
+        period = 1 / config.effective_package_rate()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        t_start = time.perf_counter()
+        n_scheduled = 0
+        held_back = None
+        packages = self.packages()
+
+        try:
+            while not self._stop_event.is_set():
+                if self.duration is not None and time.perf_counter() - t_start > self.duration:
+                    break
+
+                n_burst = config.burst_size if self._random.random() < config.burst_probability else 1
+                if n_burst > 1:
+                    self.stats.bursts += 1
+
+                # Pacing: a burst sends several packages at once and then waits accordingly long, i.e. the average
+                # package rate is unaffected by bursts.
+                delay = t_start + n_scheduled * period - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                elif delay < -period:
+                    self.stats.late += 1
+                n_scheduled += n_burst
+
+                for _ in range(n_burst):
+                    package = next(packages)
+                    if self._random.random() < config.loss:
+                        self.stats.lost += 1
+                        continue
+
+                    if held_back is None and self._random.random() < config.reorder:
+                        held_back = package
+                        self.stats.reordered += 1
+                        continue
+
+                    sock.sendto(package, self.address)
+                    self.stats.sent += 1
+                    if held_back is not None:
+                        sock.sendto(held_back, self.address)
+                        self.stats.sent += 1
+                        held_back = None
+        finally:
+            sock.close()
+
+
+class SequenceTracker:
+    """
+    Receiver side bookkeeping of RTP sequence numbers per ssrc (taking the 16 bit wrap around into account).
+    Provides number of received, lost (i.e. never received) and out of order packages.
+    """
+
+    def __init__(self):
+        self.streams = {}
+
+    def update(self, data: bytes):
+        sequence, _, ssrc = parse_rtp_header(data)
+        if ssrc not in self.streams:
+            self.streams[ssrc] = {"first": sequence, "highest": sequence, "received": 1, "out_of_order": 0}
+            return
+
+        stream = self.streams[ssrc]
+        stream["received"] += 1
+        delta = (sequence - stream["highest"]) & 0xffff
+        if delta < 0x8000:
+            stream["highest"] += delta
+        else:
+            stream["out_of_order"] += 1
+
+    def received(self) -> int:
+        return sum(s["received"] for s in self.streams.values())
+
+    def lost(self) -> int:
+        return sum(max(s["highest"] - s["first"] + 1 - s["received"], 0) for s in self.streams.values())
+
+    def out_of_order(self) -> int:
+        return sum(s["out_of_order"] for s in self.streams.values())
+
+
+def start_senders(ip: str, port: int, configs: List[StreamConfig], duration: Union[float, None] = None,
+                  seed: Union[int, None] = None) -> List[RTPSender]:
+    """Starts one RTPSender per config and returns them."""
+    senders = [RTPSender(ip, port, config, duration=duration, seed=None if seed is None else seed + j)
+               for j, config in enumerate(configs)]
+    for sender in senders:
+        sender.start()
+    return senders
+
+
+def add_stream_arguments(parser: argparse.ArgumentParser):
+    """Adds the command line arguments defining the streams of the load generator."""
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--streams", type=int, default=1, help="Number of concurrent streams.")
+    parser.add_argument("--frequency", type=float, nargs="+", default=[442.],
+                        help="Frequency of the synthetic signal per stream (cycled if fewer than streams).")
+    parser.add_argument("--note-duration", type=float, default=None,
+                        help="Seconds after which each stream switches to the next of --frequency (cycled, starting "
+                             "at a different one per stream), such that FFT/IF are computed repeatedly.")
+    parser.add_argument("--input", default=None, help="Recorded audio (.raw/.pcm as PCM S16LE or e.g. .wav).")
+    parser.add_argument("--sampling-rate", type=int, default=44100)
+    parser.add_argument("--samples-per-package", type=int, default=SAMPLES_PER_PACKAGE)
+    parser.add_argument("--package-rate", type=float, default=None,
+                        help="Packages per second per stream, defaults to real time.")
+    parser.add_argument("--loss", type=float, default=0.)
+    parser.add_argument("--reorder", type=float, default=0.)
+    parser.add_argument("--burst-probability", type=float, default=0.)
+    parser.add_argument("--burst-size", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds, runs until interrupted if omitted.")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stream_configs_from_arguments(args: argparse.Namespace) -> List[StreamConfig]:
+    audio = load_pcm(args.input, args.sampling_rate) if args.input is not None else None
+    if args.note_duration is not None and len(args.frequency) < 2:
+        raise ValueError("Expected at least two frequencies for --note-duration.")
+    n = len(args.frequency)
+    return [StreamConfig(frequency=args.frequency[j % n],
+                         notes=[args.frequency[(j + i) % n] for i in range(n)],
+                         note_duration=args.note_duration, sampling_rate=args.sampling_rate,
+                         samples_per_package=args.samples_per_package, package_rate=args.package_rate,
+                         loss=args.loss, reorder=args.reorder, burst_probability=args.burst_probability,
+                         burst_size=args.burst_size, audio=audio) for j in range(args.streams)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTP load generator streaming PCM S16LE.")
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+
+    senders = start_senders(args.ip, args.port, stream_configs_from_arguments(args), args.duration, args.seed)
+    try:
+        for sender in senders:
+            sender.join()
+    except KeyboardInterrupt:
+        for sender in senders:
+            sender.stop()
+
+    for sender in senders:
+        print(f"ssrc {sender.ssrc}: {sender.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Union
+
+T0 = time.perf_counter()
+
+timings: Dict[str, float] = {}
+_lock = threading.Lock()
+_warmup_thread: Union[threading.Thread, None] = None
+
+
+def _seconds_since_process_start() -> float:
+    """Returns the age of the process (via /proc, i.e. Linux only), nan if not available."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+
+timings["process start until startup module"] = _seconds_since_process_start()
+
+
+@contextmanager
+def timed(name: str):
+    """Records the duration of the block under the given name."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            timings[name] = time.perf_counter() - t
+
+
+def mark(name: str):
+    """Records the time since this module was imported under the given name (only the first call counts)."""
+    with _lock:
+        timings.setdefault(name, time.perf_counter() - T0)
+
+
+def report() -> str:
+    with _lock:
+        return "\n".join(f"{k}: {v:.3f}s" for k, v in timings.items())
+
+
+class LazyModule:
+    """
+    Proxy for a module which is imported on first attribute access, e.g. librosa = LazyModule("librosa").
+    The import time is recorded in timings by the access which actually imports the module, i.e. not by further
+    proxies of the same module (as used by several modules) which only look it up.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, item):
+        if self._module is None:
+            if self._name in sys.modules:
+                # Waits if another thread is still importing it.
+                self._module = importlib.import_module(self._name)
+            else:
+                # Including the first attribute, since packages may load their submodules lazily (e.g. librosa>=0.10).
+                with timed(f"import {self._name}"):
+                    self._module = importlib.import_module(self._name)
+                    return getattr(self._module, item)
+        return getattr(self._module, item)
+
+
+def warmup(sampling_rate: int = 44100):
+    """
+    Runs the DSP functions of lib.audio once on a short synthetic signal, such that the heavy imports and the
+    JIT compilation of librosa (numba) are done before live audio arrives. With a persistent NUMBA_CACHE_DIR the
+    compiled code is reused by later processes.
+    """
+    from lib.audio import audio_from_udp, compute_yin, compute_fft, compute_if, hz_to_note
+    from lib.rtp import synthetic_audio, packetize, build_rtp_package
+
+    with timed("warmup total"):
+        audio = synthetic_audio(442, 1., sampling_rate)
+        all_data = [build_rtp_package(payload, j, 0, 0) for j, payload in enumerate(packetize(audio))]
+
+        with timed("warmup read_udp_package"):
+            audio, t0 = audio_from_udp(all_data)
+        with timed("warmup yin"):
+            compute_yin(audio, t0, sampling_rate)
+            hz_to_note(442)
+        with timed("warmup fft"):
+            compute_fft(audio, sampling_rate)
+        with timed("warmup if"):
+            compute_if(audio, sampling_rate)
+    mark("warmup done")
+
+
+def start_warmup(sampling_rate: int = 44100) -> threading.Thread:
+    """Starts warmup in a background thread, only once per process."""
+    global _warmup_thread
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warmup, args=(sampling_rate,), daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+if __name__ == '__main__':
+    # Used at build time to fill the numba cache, see Dockerfile. Imported explicitly since lib.audio refers to
+    # lib.startup rather than __main__. The FFT backend of the default config is selected first, such that the
+    # cached code matches what the app runs.
+    from components.config import InternalAppConfig
+    from lib import startup
+    from lib.fft import set_backend
+    internal_app_config = InternalAppConfig.default()
+    set_backend(internal_app_config.fft_backend, internal_app_config.fft_workers)
+    startup.warmup()
+    print(startup.report())
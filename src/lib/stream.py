@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Tuple, List, Union, Dict, BinaryIO
+
+import numpy
+import pandas
+
+from lib.utils import DataBuffer
+
+# Every frame consists of a header (frame type, payload length) followed by the payload. All values are big endian.
+FRAME_HEADER = struct.Struct("!BI")
+FRAME_PITCH = 1
+FRAME_RECORD = 2
+FRAME_SPECTRUM = 3
+
+PITCH = struct.Struct("!d8sff")  # t (epoch unix time), note, f0 (Hz), pitch (cent)
+RECORD = struct.Struct("!8s8f")  # note, f0, pitch0, fft pitch 0/1, if pitch 0/1, fft beat 0/1
+SPECTRUM = struct.Struct("!8sI")  # type (e.g. f0_if), n followed by n x values (cent) and n y values (float32)
+
+RECORD_COLUMNS = ["note0", "f0", "pitch0", "fft pitch 0", "fft pitch 1", "if pitch 0", "if pitch 1", "fft beat 0",
+                  "fft beat 1"]
+
+
+def _frame(frame_type: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(frame_type, len(payload)) + payload
+
+
+def encode_pitch(t: float, note: str, f0: float, pitch: float) -> bytes:
+    return _frame(FRAME_PITCH, PITCH.pack(t, note.encode()[:8], f0, pitch))
+
+
+def encode_record(record: Dict[str, Union[str, float]]) -> bytes:
+    values = [record[k] for k in RECORD_COLUMNS[1:]]
+    return _frame(FRAME_RECORD, RECORD.pack(str(record["note0"]).encode()[:8], *values))
+
+
+def encode_spectrum(spectrum_type: str, x: numpy.array, y: numpy.array) -> bytes:
+    payload = SPECTRUM.pack(spectrum_type.encode()[:8], len(x)) + numpy.asarray(x, ">f4").tobytes() + \
+              numpy.asarray(y, ">f4").tobytes()
+    return _frame(FRAME_SPECTRUM, payload)
+
+
+def decode_frame(frame_type: int, payload: bytes) -> Tuple[int, dict]:
+    """Inverse of the encode_* functions, returns frame type and content as dict."""
+    if frame_type == FRAME_PITCH:
+        t, note, f0, pitch = PITCH.unpack(payload)
+        return frame_type, {"t": t, "note0": note.rstrip(b"\x00").decode(), "f0": f0, "pitch0": pitch}
+    elif frame_type == FRAME_RECORD:
+        note, *values = RECORD.unpack(payload)
+        return frame_type, {"note0": note.rstrip(b"\x00").decode(), **dict(zip(RECORD_COLUMNS[1:], values))}
+    elif frame_type == FRAME_SPECTRUM:
+        spectrum_type, n = SPECTRUM.unpack_from(payload)
+        values = numpy.frombuffer(payload, ">f4", count=2 * n, offset=SPECTRUM.size).astype(numpy.float64)
+        return frame_type, {"type": spectrum_type.rstrip(b"\x00").decode(), "x": values[:n], "y": values[n:]}
+    else:
+        raise ValueError(f"Unknown frame type {frame_type}.")
+
+
+def read_frame(f: BinaryIO) -> Tuple[int, dict]:
+    """Reads and decodes the next frame from a binary file object (e.g. socket.makefile("rb"))."""
+    header = f.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        raise EOFError("Stream closed.")
+    frame_type, length = FRAME_HEADER.unpack(header)
+    return decode_frame(frame_type, f.read(length))
+
+
+def same_pitch(a: tuple, b: Union[tuple, None]) -> bool:
+    """Elementwise equality of pitch tuples (note, f0, pitch), NaN equals NaN (e.g. no pitch detected)."""
+    return b is not None and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+
+class _Subscriber:
+    def __init__(self, max_queue_size: int):
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.task = asyncio.current_task()
+        self.resyncs = 0
+
+
+class ResultPublisher:
+    """
+    Publishes pitch updates, new records and spectra as compact binary frames via TCP to any number of subscribers.
+    Frames are encoded once in the publishing thread and the same bytes are fanned out to all subscribers by an
+    asyncio server running in a background thread.
+    A new subscriber first receives a snapshot (latest pitch, last max_records records, latest spectra), afterwards
+    only deltas. If a subscriber does not keep up (more than max_queue_size pending frames), its pending frames are
+    replaced by the latest pitch and spectra, i.e. the records in between are skipped and slow subscribers neither
+    block the publisher nor the other subscribers.
+    """
+
+    def __init__(self, ip: str, port: int, max_queue_size: int = 256, max_records: int = 1000):
+        self.ip = ip
+        self.port = port
+        self.max_queue_size = max_queue_size
+
+        self.subscribers = set()
+        # State for snapshots, only accessed from within the event loop.
+        self.last_pitch = None
+        self.records = deque(maxlen=max_records)
+        self.spectra = []
+
+        self._published_pitch = None
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = None
+        self._error = None
+        self.server = None
+
+    def start(self):
+        """Starts the server thread, raises the exception of start_server (e.g. port already in use)."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self.loop.close()
+            raise self._error
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    async def _shutdown(self):
+        self.server.close()
+        tasks = [subscriber.task for subscriber in self.subscribers]
+        for task in tasks:
+            task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.ip, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+        self.loop.run_forever()
+
+    def _latest(self) -> List[bytes]:
+        """Latest pitch and spectra, sent to subscribers which did not keep up."""
+        return ([self.last_pitch] if self.last_pitch is not None else []) + self.spectra
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriber = _Subscriber(self.max_queue_size)
+        # The snapshot is written directly, such that the queue only holds deltas. No await in between, i.e. no
+        # delta is missed.
+        pitch = [self.last_pitch] if self.last_pitch is not None else []
+        for frame in pitch + list(self.records) + self.spectra:
+            writer.write(frame)
+        self.subscribers.add(subscriber)
+        try:
+            await writer.drain()
+            while True:
+                frame = await subscriber.queue.get()
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+    def _broadcast(self, frame_type: int, frames: List[bytes]):
+        if frame_type == FRAME_PITCH:
+            self.last_pitch = frames[0]
+        elif frame_type == FRAME_RECORD:
+            self.records.extend(frames)
+        elif frame_type == FRAME_SPECTRUM:
+            self.spectra = frames
+
+        for subscriber in self.subscribers:
+            if subscriber.queue.qsize() + len(frames) > self.max_queue_size:
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.resyncs += 1
+                frames_ = self._latest()[:self.max_queue_size]
+            else:
+                frames_ = frames
+            for frame in frames_:
+                subscriber.queue.put_nowait(frame)
+
+    def publish(self, frame_type: int, frames: List[bytes]):
+        """Thread safe, frames need to be of frame_type. Spectrum frames replace all previous spectra."""
+        self.loop.call_soon_threadsafe(self._broadcast, frame_type, frames)
+
+    def publish_update(self, buffer_rolling_yin: DataBuffer, buffer_records: DataBuffer,
+                       buffer_fft_result: DataBuffer, just_computed_fft: bool):
+        """Publishes the changes of a single update_from_data call."""
+        last_record = buffer_rolling_yin.df.iloc[-1]
+        pitch = (last_record["note0"], numpy.round(last_record["f0"], 2), numpy.round(last_record["pitch0"] * 100, 2))
+        if not same_pitch(pitch, self._published_pitch):
+            self._published_pitch = pitch
+            self.publish(FRAME_PITCH, [encode_pitch(time.time(), *pitch)])
+
+        if just_computed_fft:
+            self.publish(FRAME_RECORD, [encode_record(buffer_records.df.iloc[-1])])
+
+            df: pandas.DataFrame = buffer_fft_result.df
+            df = df[~df.isnull().all(axis=1)]
+            self.publish(FRAME_SPECTRUM, [encode_spectrum(spectrum_type, dg["x"].values, dg["y"].values)
+                                          for spectrum_type, dg in df.groupby("type", sort=False)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints the frames of a result stream.")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5006)
+    args = parser.parse_args()
+
+    with socket.create_connection((args.ip, args.port)) as sock:
+        f = sock.makefile("rb")
+        while True:
+            frame_type, content = read_frame(f)
+            if frame_type == FRAME_SPECTRUM:
+                content = {"type": content["type"], "n": len(content["x"])}
+            print(frame_type, content, flush=True)
+
+
+if __name__ == '__main__':
+    main()
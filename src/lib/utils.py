@@ -36,17 +36,23 @@ class ConfigHandler:
     PATH: str
     PARAMETERS: List[Parameter]
 
+    @classmethod
+    def default(cls):
+        return cls(**{**{k.name: k.default_value() for k in cls.PARAMETERS}, "PATH": cls.PATH,
+                      "PARAMETERS": cls.PARAMETERS})
+
     @classmethod
     def load(cls):
         if not os.path.isfile(cls.PATH):
-            obj = cls(**{**{k.name: k.default_value() for k in cls.PARAMETERS}, "PATH": cls.PATH,
-                         "PARAMETERS": cls.PARAMETERS})
+            obj = cls.default()
             obj.save()
             return obj
         else:
             with open(cls.PATH, "rb") as f:
                 config = pickle.load(f)
-            return cls(**{**config, "PATH": cls.PATH, "PARAMETERS": cls.PARAMETERS})
+            # Parameters missing in config files written by older versions fall back to their default value.
+            config = {k.name: config[k.name] for k in cls.PARAMETERS if k.name in config}
+            return cls(**{**cls.default().to_dict(), **config, "PATH": cls.PATH, "PARAMETERS": cls.PARAMETERS})
 
     def to_dict(self):
         return {k.name: self.__getattribute__(k.name) for k in self.PARAMETERS}
@@ -1,5 +1,4 @@
 import asyncio
-import socket
 
 import altair as alt
 import numpy
@@ -7,14 +6,25 @@ import pandas
 import streamlit as st
 
 from components.config import AppConfig, InternalAppConfig
-from components.update import ComputationState, update_from_data
+from components.pipeline import open_socket, produce, consume
+from components.update import ComputationState
+from lib.fft import set_backend
+from lib.startup import start_warmup, mark, report, timings
+from lib.stream import ResultPublisher
 from lib.utils import DataBuffer
 
 internal_app_config = InternalAppConfig.load()
+set_backend(internal_app_config.fft_backend, internal_app_config.fft_workers)
+if internal_app_config.do_warmup:
+    start_warmup(AppConfig.load().sampling_rate)
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-sock.bind((internal_app_config.udp_ip, internal_app_config.udp_port))
+sock = open_socket(internal_app_config.udp_ip, internal_app_config.udp_port)
+
+
+@st.experimental_singleton
+def result_publisher(ip: str, port: int) -> ResultPublisher:
+    """Single publisher per process, i.e. shared by all sessions/reruns."""
+    return ResultPublisher(ip, port).start()
 
 
 def plot(buffer_yin: DataBuffer, buffer_rolling_yin: DataBuffer, buffer_audio: DataBuffer, buffer_records: DataBuffer,
@@ -73,69 +83,32 @@ def plot(buffer_yin: DataBuffer, buffer_rolling_yin: DataBuffer, buffer_audio: D
             second_row[1].altair_chart(chart, use_container_width=True)
 
 
-async def produce(queue):
-    while True:
-        try:
-            data, addr = sock.recvfrom(65507)
-            _ = await queue.put(data)
-            _ = await asyncio.sleep(0.001)
-        except Exception as e:
-            print("Producer Exception", e)
-
-
-async def consume(queue):
-    buffer_yin = DataBuffer(columns=["t", "note0", "f0", "pitch0", "dt"],
-                            cache_size=10000,
-                            time_col="t",
-                            time_range=15 * 60,
-                            groupby_cols=["note0"],
-                            group_size=500)
-
-    buffer_audio = DataBuffer(columns=["val"], cache_size=1200000)  # 1300000 corresponds to 1 cent resolution for C2
-
-    buffer_rolling_yin = DataBuffer(columns=["note0", "f0", "pitch0"], cache_size=100)
-    buffer_rolling_yin.ingest(pandas.DataFrame([{"note0": "UNK", "f0": 0, "pitch0": -100}]))
-
-    buffer_records = DataBuffer(
-        columns=["note0", "f0", "pitch0", "fft pitch 0", "fft pitch 1", "if pitch 0", "if pitch 1"],
-        cache_size=1000)
-
-    buffer_fft_result = DataBuffer(columns=["x", "y", "type"], cache_size=300000)
-
-    buffer_fft_computation = DataBuffer(columns=["val"], cache_size=5)
-    buffer_fft_computation.ingest(pandas.DataFrame([{"val": False}]))
-
-    state = ComputationState(buffer_fft_computation=buffer_fft_computation,
-                             current_filling_buffer_audio=-1,
-                             target_buffer_size_if=-1,
-                             target_buffer_size_fft=-1)
+async def run():
+    queue = asyncio.Queue()
     app_config = AppConfig.load()
 
-    while True:
+    publisher = None
+    if internal_app_config.do_stream:
         try:
-            all_data = []
-            for _ in range(internal_app_config.batch_size):
-                item = await queue.get()
-                all_data += [item]
-                queue.task_done()
+            publisher = result_publisher(internal_app_config.stream_ip, internal_app_config.stream_port)
+        except OSError as e:
+            print("Result stream disabled, publisher could not be started:", e)
 
-            buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state = \
-                update_from_data(all_data, buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records,
-                                 buffer_fft_result, state, app_config, internal_app_config)
+    def on_update(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result, state,
+                  processing_time):
+        if "first pitch" not in timings and not numpy.isnan(buffer_rolling_yin.df["f0"].values[-1]):
+            mark("first pitch")
+            print(report())
 
-            plot(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result,
-                 state, app_config, internal_app_config, placeholder_main)
+        if publisher is not None:
+            publisher.publish_update(buffer_rolling_yin, buffer_records, buffer_fft_result, state.just_computed_fft())
 
-        except Exception as e:
-            print("Consumer Exception", e)
-
-
-async def run():
-    queue = asyncio.Queue()
+        plot(buffer_yin, buffer_rolling_yin, buffer_audio, buffer_records, buffer_fft_result,
+             state, app_config, internal_app_config, placeholder_main)
 
-    consumer = asyncio.create_task(consume(queue))
+    consumer = asyncio.create_task(consume(queue, app_config, internal_app_config, on_update))
     consumers = [consumer]
-    _ = await produce(queue)
+    _ = await produce(sock, queue)
     _ = await queue.join()
 
     consumer.cancel()
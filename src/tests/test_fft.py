@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import librosa
+import numpy
+
+from lib.audio import compute_fft
+from lib import fft
+from lib.fft import set_backend, get_backend, register_fftlib, fft_frequencies, hann_half_window
+
+
+class TestFFT(unittest.TestCase):
+
+    def test_fast_len(self):
+        backend = set_backend("numpy")
+        assert backend.next_fast_len(4 * 132300) == 2 ** 20
+        assert backend.prev_fast_len(131660) == 131660
+
+        backend = set_backend("scipy", workers=2)
+        assert get_backend() is backend
+        for n in [1, 7, 131660, 4 * 1080000 + 1]:
+            n_next = backend.next_fast_len(n)
+            n_prev = backend.prev_fast_len(n)
+            assert n_prev <= n <= n_next
+            for m in [n_next, n_prev]:
+                for p in [2, 3, 5, 7, 11]:
+                    while m % p == 0:
+                        m //= p
+                assert m == 1, (n, n_next, n_prev)
+
+        with self.assertRaises(ValueError):
+            set_backend("fftw")
+
+    def test_register_fftlib(self):
+        # Selecting a backend does not import librosa (see lib/startup.py), registering is deferred until first usage.
+        code = "import sys; from lib.fft import set_backend; set_backend(); assert 'librosa' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        backend = set_backend("scipy", workers=2)
+        register_fftlib()
+        assert librosa.get_fftlib() is backend and fft._registered_backend is backend
+
+    def test_compute_fft(self):
+        sr = 44100
+        # Not a power of two as well as a power of two.
+        for n in [50000, 65536]:
+            audio = numpy.sin(2 * numpy.pi * 442 * numpy.arange(n) / sr)
+
+            # numpy backend coincides with the previous implementation based on librosa.stft.
+            set_backend("numpy")
+            magnitudes, frequencies = compute_fft(audio, sr)
+            n_fft = 2 ** (int(numpy.log2(len(audio)))) * 2 ** 3
+            stft = numpy.abs(librosa.stft(audio, hop_length=n_fft, n_fft=n_fft, win_length=n_fft, center=True))
+            assert len(frequencies) == n_fft // 2 + 1, (n, len(frequencies))
+            assert numpy.allclose(magnitudes, numpy.mean(stft, axis=1))
+            assert numpy.allclose(frequencies, librosa.fft_frequencies(sr=sr, n_fft=n_fft))
+
+            # Powers of two are fast sizes for scipy as well, i.e. same grid.
+            set_backend("scipy")
+            magnitudes_, frequencies_ = compute_fft(audio, sr)
+            assert numpy.allclose(magnitudes_, magnitudes)
+            assert fft_frequencies(2 * (len(frequencies_) - 1), sr) is frequencies_
+
+        # Window is cached per n_fft regardless of the length of the audio.
+        hann_half_window.cache_clear()
+        set_backend("numpy")
+        for n in [50000, 51000, 52000]:
+            compute_fft(numpy.ones(n), sr)
+        assert hann_half_window.cache_info().misses == 1
+        assert not hann_half_window(8).flags.writeable
+        assert numpy.allclose(hann_half_window(8), librosa.filters.get_window("hann", 8)[4:])
+
+
+if __name__ == '__main__':
+    unittest.main()
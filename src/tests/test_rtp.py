@@ -0,0 +1,78 @@
+import argparse
+import socket
+import unittest
+
+import numpy
+
+from lib.audio import read_udp_package, audio_from_udp
+from lib.rtp import build_rtp_package, parse_rtp_header, synthetic_audio, packetize, SequenceTracker, \
+    StreamConfig, RTPSender, note_schedule, add_stream_arguments, stream_configs_from_arguments
+
+
+class TestRTP(unittest.TestCase):
+
+    def test_build_rtp_package(self):
+        audio = synthetic_audio(442, .1, sampling_rate=44100)
+        payloads = packetize(audio, 730)
+        assert len(payloads) == int(.1 * 44100) // 730
+
+        all_data = [build_rtp_package(p, 65534 + j, 2 ** 32 - 1000 + j * 730, 1234) for j, p in enumerate(payloads)]
+        assert parse_rtp_header(all_data[0]) == (65534, 2 ** 32 - 1000, 1234)
+        assert parse_rtp_header(all_data[2]) == (0, 460, 1234)
+
+        audio_0, _ = read_udp_package(all_data[0])
+        assert len(audio_0) == 730
+        audio_, _ = audio_from_udp(all_data)
+        assert numpy.allclose(audio_ / (2 ** 15 - 1), audio[:len(audio_)], atol=1e-4)
+
+    def test_sequence_tracker(self):
+        tracker = SequenceTracker()
+        for sequence in [65533, 65534, 0, 65535, 2, 3]:
+            tracker.update(build_rtp_package(b"\x00\x00", sequence, 0, 1))
+        for sequence in [10, 11]:
+            tracker.update(build_rtp_package(b"\x00\x00", sequence, 0, 2))
+
+        assert tracker.received() == 8
+        assert tracker.lost() == 1, tracker.lost()
+        assert tracker.out_of_order() == 1
+
+    def test_note_schedule(self):
+        sr = 44100
+        audio = note_schedule([442, 330], .5, sr)
+        assert len(audio) == sr
+        for j, f in enumerate([442, 330]):
+            spectrum = numpy.abs(numpy.fft.rfft(audio[j * sr // 2:(j + 1) * sr // 2]))
+            assert abs(numpy.argmax(spectrum) * 2 - f) <= 2
+
+        parser = argparse.ArgumentParser()
+        add_stream_arguments(parser)
+        configs = stream_configs_from_arguments(
+            parser.parse_args("--streams 3 --frequency 442 330 --note-duration 10".split()))
+        assert [c.notes for c in configs] == [[442, 330], [330, 442], [442, 330]]
+        with self.assertRaises(ValueError):
+            stream_configs_from_arguments(parser.parse_args("--frequency 442 --note-duration 10".split()))
+
+    def test_sender(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(2)
+
+        config = StreamConfig(package_rate=500, loss=.1, reorder=.1, burst_probability=.1, burst_size=3)
+        sender = RTPSender("127.0.0.1", sock.getsockname()[1], config, duration=.15, seed=0)
+        sender.start()
+        sender.join()
+
+        tracker = SequenceTracker()
+        for _ in range(sender.stats.sent):
+            data, _ = sock.recvfrom(65507)
+            tracker.update(data)
+        sock.close()
+
+        assert sender.stats.sent > 30
+        assert tracker.received() == sender.stats.sent
+        assert tracker.lost() <= sender.stats.lost
+        assert tracker.out_of_order() > 0
+
+
+if __name__ == '__main__':
+    unittest.main()
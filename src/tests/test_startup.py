@@ -0,0 +1,47 @@
+import sys
+import unittest
+
+from lib import startup
+from lib.startup import LazyModule, start_warmup, timed, timings, mark, report
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_lazy_module(self):
+        sys.modules.pop("colorsys", None)
+        colorsys = LazyModule("colorsys")
+        assert "colorsys" not in sys.modules
+        assert colorsys.rgb_to_hsv(1., 0., 0.) == (0., 1., 1.)
+        assert "colorsys" in sys.modules
+        assert "import colorsys" in timings
+
+    def test_lazy_module_shared(self):
+        # Only the proxy which actually imports the module records the import time.
+        sys.modules.pop("colorsys", None)
+        timings.pop("import colorsys", None)
+        first, second = LazyModule("colorsys"), LazyModule("colorsys")
+        _ = first.rgb_to_hsv
+        t = timings["import colorsys"]
+        assert second.rgb_to_hsv(1., 0., 0.) == (0., 1., 1.)
+        assert timings["import colorsys"] == t
+
+    def test_timings(self):
+        with timed("test block"):
+            pass
+        mark("test mark")
+        t = timings["test mark"]
+        mark("test mark")
+        assert timings["test mark"] == t
+        assert "test block: " in report()
+
+    def test_warmup(self):
+        thread = start_warmup()
+        assert start_warmup() is thread
+        thread.join()
+        assert startup._warmup_thread is thread
+        for name in ["warmup yin", "warmup fft", "warmup if", "warmup done"]:
+            assert name in timings, report()
+
+
+if __name__ == '__main__':
+    unittest.main()
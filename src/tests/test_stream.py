@@ -0,0 +1,110 @@
+import asyncio
+import socket
+import unittest
+
+import numpy
+import pandas
+
+from lib.stream import encode_pitch, encode_record, encode_spectrum, decode_frame, read_frame, ResultPublisher, \
+    FRAME_HEADER, FRAME_PITCH, FRAME_RECORD, FRAME_SPECTRUM, _Subscriber
+from lib.utils import DataBuffer
+
+
+class TestStream(unittest.TestCase):
+
+    def test_encode_decode(self):
+        frame = encode_pitch(1.5, "A4", 442., -1.25)
+        frame_type, content = decode_frame(*FRAME_HEADER.unpack(frame[:FRAME_HEADER.size])[:1],
+                                           frame[FRAME_HEADER.size:])
+        assert frame_type == FRAME_PITCH
+        assert content == {"t": 1.5, "note0": "A4", "f0": 442., "pitch0": -1.25}, content
+
+        record = {"note0": "C♯5", "f0": 554.5, "pitch0": 1.5, "fft pitch 0": 1.25, "fft pitch 1": numpy.nan,
+                  "if pitch 0": 1.5, "if pitch 1": 2., "fft beat 0": 2.5, "fft beat 1": numpy.nan}
+        frame_type, content = decode_frame(FRAME_RECORD, encode_record(record)[FRAME_HEADER.size:])
+        assert content["note0"] == "C♯5"
+        assert numpy.isnan(content["fft pitch 1"])
+        assert content["if pitch 1"] == 2.
+        assert content["fft beat 0"] == 2.5
+
+        x = numpy.linspace(-25, 25, 11)
+        frame_type, content = decode_frame(FRAME_SPECTRUM, encode_spectrum("f0_if", x, x ** 2)[FRAME_HEADER.size:])
+        assert content["type"] == "f0_if"
+        assert numpy.allclose(content["x"], x) and numpy.allclose(content["y"], x ** 2)
+
+    def test_publisher(self):
+        publisher = ResultPublisher("127.0.0.1", 0).start()
+
+        buffer_rolling_yin = DataBuffer(columns=["note0", "f0", "pitch0"], cache_size=2)
+        buffer_rolling_yin.ingest(pandas.DataFrame([{"note0": "A4", "f0": 442., "pitch0": .01}]))
+        buffer_records = DataBuffer(
+            columns=["note0", "f0", "pitch0", "fft pitch 0", "fft pitch 1", "if pitch 0", "if pitch 1", "fft beat 0",
+                     "fft beat 1"], cache_size=2)
+        buffer_records.ingest(pandas.DataFrame([{"note0": "A4", "f0": 442., "pitch0": 1., "fft pitch 0": 1.,
+                                                 "fft pitch 1": 2., "if pitch 0": 3., "if pitch 1": 4.,
+                                                 "fft beat 0": 1., "fft beat 1": numpy.nan}]))
+        buffer_fft_result = DataBuffer(columns=["x", "y", "type"], cache_size=10)
+        buffer_fft_result.ingest(pandas.DataFrame({"x": [0., 1., 2.], "y": [1., 2., 3.], "type": ["f0", "f0", "f1"]}))
+
+        publisher.publish_update(buffer_rolling_yin, buffer_records, buffer_fft_result, True)
+        # Unchanged pitch is not published again.
+        publisher.publish_update(buffer_rolling_yin, buffer_records, buffer_fft_result, False)
+
+        subscribers = [socket.create_connection(("127.0.0.1", publisher.port), timeout=2) for _ in range(2)]
+        files = [s.makefile("rb") for s in subscribers]
+        for f in files:
+            frames = [read_frame(f) for _ in range(4)]
+            assert [frame_type for frame_type, _ in frames] == [FRAME_PITCH, FRAME_RECORD, FRAME_SPECTRUM,
+                                                                FRAME_SPECTRUM]
+            assert frames[0][1]["pitch0"] == 1.
+            assert [content["type"] for _, content in frames[2:]] == ["f0", "f1"]
+
+        buffer_rolling_yin.ingest(pandas.DataFrame([{"note0": "A4", "f0": 442.5, "pitch0": .02}]))
+        publisher.publish_update(buffer_rolling_yin, buffer_records, buffer_fft_result, False)
+        for f in files:
+            frame_type, content = read_frame(f)
+            assert frame_type == FRAME_PITCH and content["f0"] == 442.5
+
+        for s in subscribers:
+            s.close()
+        publisher.stop()
+
+    def test_port_in_use(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            with self.assertRaises(OSError):
+                ResultPublisher("127.0.0.1", sock.getsockname()[1]).start()
+
+    def test_slow_subscriber(self):
+        publisher = ResultPublisher("127.0.0.1", 0, max_queue_size=4).start()
+
+        async def overflow():
+            subscriber = _Subscriber(publisher.max_queue_size)
+            publisher.subscribers.add(subscriber)
+            publisher._broadcast(FRAME_PITCH, [b"p"])
+            publisher._broadcast(FRAME_SPECTRUM, [b"s0", b"s1"])
+            for _ in range(10):
+                publisher._broadcast(FRAME_RECORD, [b"r"])
+            publisher.subscribers.discard(subscriber)
+            return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())], subscriber.resyncs
+
+        frames, resyncs = asyncio.run_coroutine_threadsafe(overflow(), publisher.loop).result()
+        # Queue stays bounded, resync only with latest pitch and spectra.
+        assert resyncs > 0
+        assert len(frames) <= 4 and frames[:3] == [b"p", b"s0", b"s1"], frames
+        assert len(publisher.records) == 10
+
+        # NaN pitch (nothing detected) is only published once.
+        published = []
+        publisher.publish = lambda frame_type, frames_: published.append(frame_type)
+        buffer_rolling_yin = DataBuffer(columns=["note0", "f0", "pitch0"], cache_size=2)
+        buffer_rolling_yin.ingest(pandas.DataFrame([{"note0": "-", "f0": numpy.nan, "pitch0": numpy.nan}]))
+        for _ in range(3):
+            publisher.publish_update(buffer_rolling_yin, None, None, False)
+        assert published == [FRAME_PITCH]
+        publisher.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,8 @@ import unittest
 
 import numpy
 
-from lib.audio import res_cent_to_dt, hz_to_note, read_udp_package, audio_from_udp, compute_yin
+from lib.audio import res_cent_to_dt, hz_to_note, read_udp_package, audio_from_udp, compute_yin, compute_fft, \
+    compute_if, analyze_partials, frequency_to_cents
 
 
 class TestAudio(unittest.TestCase):
@@ -33,6 +34,47 @@ class TestAudio(unittest.TestCase):
 
         assert abs(len(df_yin) - len(audio) // (2048 // 2)) <= 1, (len(df_yin), len(audio) // (2048 // 2))
 
+    def test_analyze_partials(self):
+        sr = 44100
+        t = numpy.arange(3 * sr) / sr
+        # Paired reeds beating at 2Hz plus an octave which is 2 cent sharp.
+        audio = numpy.sin(2 * numpy.pi * 442 * t) + .8 * numpy.sin(2 * numpy.pi * 444 * t) + \
+                .5 * numpy.sin(2 * numpy.pi * 884 * 2 ** (2 / 1200) * t)
+
+        magnitudes, frequencies = compute_fft(audio, sr)
+        partials, _, _ = analyze_partials(frequencies, magnitudes, 442, 8, -25, 25, 442, is_sorted=True)
+        assert len(partials) == 8
+        assert list(partials["partial"]) == list(range(1, 9))
+        assert abs(partials["cents"][0]) < .1, partials["cents"][0]
+        assert abs(partials["cents"][1] - 2) < .1, partials["cents"][1]
+        assert abs(partials["beat_hz"][0] - 2) < .1, partials["beat_hz"][0]
+        assert numpy.isnan(partials["beat_hz"][1])
+
+        # Same peaks as masking each window separately.
+        magnitudes, frequencies = compute_if(audio, sr)
+        partials, frequencies_, magnitudes_ = analyze_partials(frequencies, magnitudes, 442, 2, -25, 25, 442)
+        for row in partials:
+            fl, fu = 442 * row["partial"] * 2 ** (-25 / 1200), 442 * row["partial"] * 2 ** (25 / 1200)
+            m = (frequencies < fu) & (frequencies > fl)
+            assert row["stop"] - row["start"] == m.sum()
+            assert numpy.isclose(row["cents"], frequency_to_cents(frequencies[m][numpy.argmax(magnitudes[m])] /
+                                                                  row["partial"], 442))
+            assert numpy.all(numpy.diff(frequencies_[row["start"]:row["stop"]]) >= 0)
+
+    def test_analyze_partials_harmonic(self):
+        sr = 44100
+        t = numpy.arange(3 * sr) / sr
+        # Harmonic tone on an in tune note, partials 3, 5, 7 are off by +1.98, -13.69, -31.17 cent w.r.t. the closest
+        # note of the equal temperament but in tune w.r.t. k * f0.
+        f0 = 442 * 2 ** (-9 / 12)
+        audio = sum(numpy.sin(2 * numpy.pi * k * f0 * t) / k for k in range(1, 9))
+
+        magnitudes, frequencies = compute_fft(audio, sr)
+        partials, _, _ = analyze_partials(frequencies, magnitudes, f0, 8, -25, 25, 442, is_sorted=True)
+        for k in [3, 5, 7]:
+            assert abs(partials["cents"][k - 1]) < .1, (k, partials["cents"][k - 1])
+            assert abs(frequency_to_cents(partials["frequency"][k - 1], 442)) > 1
+
 
 if __name__ == '__main__':
     unittest.main()